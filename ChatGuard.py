@@ -1,34 +1,113 @@
 import asyncio
 import configparser
 import logging
+import random
 import re
+import time
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
 from contextlib import suppress
 from datetime import datetime, timedelta
+from urllib.parse import urlsplit
 
-import aiohttp
+import msgspec
+import orjson
+from aiohttp import web
+from aiolimiter import AsyncLimiter
 from aiogram import Bot, Dispatcher, types, F, Router
 from aiogram.client.default import DefaultBotProperties
-from aiogram.client.session import aiohttp
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.enums.chat_member_status import ChatMemberStatus
 from aiogram.enums.parse_mode import ParseMode
-from aiogram.exceptions import TelegramBadRequest
-from aiogram.filters import Command
+from aiogram.exceptions import (TelegramAPIError, TelegramBadRequest, TelegramForbiddenError, TelegramNetworkError,
+                                TelegramRetryAfter)
+from aiogram.filters import Command, CommandObject
+from aiogram.methods import SendMessage
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
+
 config = configparser.ConfigParser()
 config.read('config.ini')
 
 TOKEN = config['telegram']['TOKEN']
 CHAT_LINK = config['telegram']['CHAT_LINK']
 
+# Optional [webhook] section; without URL the bot falls back to long polling
+WEBHOOK_URL = config.get('webhook', 'URL', fallback=None)
+WEBHOOK_SECRET = config.get('webhook', 'SECRET', fallback=None)
+WEBHOOK_HOST = config.get('webhook', 'HOST', fallback='0.0.0.0')
+WEBHOOK_PORT = config.getint('webhook', 'PORT', fallback=8080)
+
 logging.basicConfig(level=logging.INFO)
 
 scheduler = AsyncIOScheduler()
-scheduler.start()
 
-bot = Bot(TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+# (chat_id, user_id) -> (is_admin, expires_at); refreshed by chat member updates, purged by the scheduler
+ADMIN_CACHE_TTL = 60
+_admin_cache: dict[tuple[int, int], tuple[bool, float]] = {}
+
+# Telegram allows ~30 requests per second overall and 20 messages per minute in a group.
+# Only groups (negative ids) get their own limiter, so private chats don't pile up here.
+global_limiter = AsyncLimiter(30, 1)
+group_limiters: defaultdict[int, AsyncLimiter] = defaultdict(lambda: AsyncLimiter(20, 60))
+
+
+class TunedAiohttpSession(AiohttpSession):
+    """AiohttpSession with a bigger connection pool, so bursts of commands don't queue for a free connection."""
+
+    def __init__(self, **kwargs):
+        super().__init__(limit=256, **kwargs)
+        # aiogram has no public connector argument; its own ttl_dns_cache workaround is kept as is
+        self._connector_init.update(limit_per_host=64, keepalive_timeout=75)
+
+
+def orjson_dumps(obj):
+    # aiogram expects str, orjson produces bytes
+    return orjson.dumps(obj).decode()
+
+
+# msgspec decodes API responses (including getUpdates batches) and orjson encodes
+# request payloads much faster than stdlib json
+session = TunedAiohttpSession(json_loads=msgspec.json.decode, json_dumps=orjson_dumps)
+bot = Bot(TOKEN, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
 dp = Dispatcher()
 
+# Mute durations, e.g. "30m" or "2d"
+_TIME_RE = re.compile(r'^(\d+)([smhdwMy])$')
+_TIME_UNITS = {
+    's': (1, "sec."),
+    'm': (60, "min."),
+    'h': (60 * 60, "h."),
+    'd': (24 * 60 * 60, "d."),
+    'w': (7 * 24 * 60 * 60, "w."),
+    'M': (30 * 24 * 60 * 60, "M."),  # Approximate a month as 30 days
+    'y': (365 * 24 * 60 * 60, "y."),  # Approximate a year as 365 days
+}
+# Telegram treats restrictions shorter than 30 seconds or longer than 366 days as permanent;
+# the lower bound keeps a margin for rounding and request latency
+MIN_MUTE_SECONDS = 60
+MAX_MUTE_SECONDS = 366 * 24 * 60 * 60
+
+# Built once and shared; media permissions follow from these since use_independent_chat_permissions is off
+_MUTE_PERMS = types.ChatPermissions(can_send_messages=False, can_send_polls=False, can_send_other_messages=False,
+                                    can_add_web_page_previews=False)
+_UNMUTE_PERMS = types.ChatPermissions(can_send_messages=True, can_send_polls=True, can_send_other_messages=True,
+                                      can_add_web_page_previews=True)
+
+# The invite is the same message for everyone: built once without validation (CHAT_LINK is not checked),
+# only chat_id is swapped per send
+_INVITE = SendMessage.model_construct(chat_id=0, text=CHAT_LINK)
+
+# Moderation announcements
+_BAN_TEMPLATE = ("🚫 <a href='tg://user?id={tid}'>{tname}</a> заблокирован навсегда\n"
+                 "👤 Модератор: <a href='tg://user?id={mid}'>{mname}</a>")
+_MUTE_TEMPLATE = "🔇 <a href='tg://user?id={tid}'>{tname}</a> был заглушен на {duration}{suffix}"
+
 # Routers
 private_router = Router()
 private_router.message.filter(F.chat.type == "private")
@@ -38,103 +117,156 @@ group_router.message.filter(F.chat.type != "private")
 
 
 # Helper Functions
-async def delete_webhook_with_retry(bot1: Bot, retries: int = 3, delay: int = 5):
+async def delete_webhook_with_retry(bot1: Bot, retries: int = 3, delay: float = 1):
     for attempt in range(retries):
         try:
             await bot1.delete_webhook(drop_pending_updates=True)
-            print("Webhook deleted successfully.")
+            logging.info("Webhook deleted successfully.")
             return
-        except aiohttp.ClientConnectorError as e:
-            print(f"Network error on attempt {attempt + 1}/{retries}: {e}")
-        except Exception as e:
-            print(f"Unexpected error on attempt {attempt + 1}/{retries}: {e}")
-        await asyncio.sleep(delay)
-    print("Failed to delete webhook after several attempts.")
+        except TelegramNetworkError as e:
+            logging.warning(f"Network error on attempt {attempt + 1}/{retries}: {e}")
+        except TelegramAPIError as e:
+            logging.warning(f"Unexpected error on attempt {attempt + 1}/{retries}: {e}")
+        if attempt + 1 < retries:
+            # Exponential backoff with a little jitter: 1s, 2s, 4s, ...
+            await asyncio.sleep(delay * (2 ** attempt) + random.uniform(0, 0.5))
+    logging.error("Failed to delete webhook after several attempts.")
+
+
+async def _send(request, chat_id: int):
+    """Await an outgoing Bot API call once the per-group (for groups) and the global limits allow it."""
+    if chat_id < 0:
+        # Wait on the group's own bucket first, so a busy group doesn't hold global tokens
+        async with group_limiters[chat_id], global_limiter:
+            return await request
+
+    async with global_limiter:
+        return await request
+
+
+def is_admin_status(status: ChatMemberStatus):
+    return status in [ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR]
 
 
 async def is_bot_admin(chat_id: int):
-    bot_status = await bot.get_chat_member(chat_id, bot.id)
-    return bot_status.status in [ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR]
+    return await is_user_admin(chat_id, bot.id)
+
+
+async def purge_admin_cache():
+    # async so AsyncIOExecutor runs it on the event loop rather than a worker thread racing the handlers
+    now = time.monotonic()
+    for key in [key for key, (_, expires_at) in _admin_cache.items() if expires_at <= now]:
+        del _admin_cache[key]
 
 
 async def is_user_admin(chat_id: int, user_id: int):
+    cached = _admin_cache.get((chat_id, user_id))
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+
     user_status = await bot.get_chat_member(chat_id, user_id)
-    return user_status.status in [ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR]
+    is_admin = is_admin_status(user_status.status)
+    _admin_cache[(chat_id, user_id)] = (is_admin, time.monotonic() + ADMIN_CACHE_TTL)
+    return is_admin
 
 
 async def check_admin(message: types.Message):
-    if not await is_bot_admin(message.chat.id):
-        await message.reply("<b>❌ Бот не является администратором чата!</b>")
+    bot_is_admin, user_is_admin = await asyncio.gather(
+        is_bot_admin(message.chat.id),
+        is_user_admin(message.chat.id, message.from_user.id),
+    )
+    if not bot_is_admin:
+        await _send(message.reply("<b>❌ Бот не является администратором чата!</b>"), message.chat.id)
         return False
 
-    if not await is_user_admin(message.chat.id, message.from_user.id):
-        await message.reply("<b>❌ Вы не администратор!</b>")
+    if not user_is_admin:
+        await _send(message.reply("<b>❌ Вы не администратор!</b>"), message.chat.id)
         return False
 
     return True
 
 
+async def check_admin_and_target(message: types.Message):
+    """Run check_admin and look up whether the replied-to user is an admin, all at once."""
+    reply_message = message.reply_to_message
+    if not reply_message:
+        return await check_admin(message), False
+
+    return await asyncio.gather(
+        check_admin(message),
+        is_user_admin(message.chat.id, reply_message.from_user.id),
+    )
+
+
 async def send_error(message: types.Message, error_text: str):
     try:
-        await message.reply(f"<b>❌ {error_text}</b>", parse_mode='HTML')
-    except Exception as e:
+        await _send(message.reply(f"<b>❌ {error_text}</b>"), message.chat.id)
+    except TelegramAPIError as e:
+        # Error replies often fail for the same reason as the original call (flood control, network);
+        # callers run inside except blocks, so this must never raise
         logging.error(f"Failed to send error message: {e}")
 
 
 def parse_time(time_str: str):
-    # Example implementation, customize as needed
-    match = re.match(r'(\d+)([smhd])', time_str)
+    match = _TIME_RE.match(time_str)
     if not match:
         return None, None
 
     amount, unit = match.groups()
     amount = int(amount)
+    unit_seconds, unit_name = _TIME_UNITS[unit]
+    duration = amount * unit_seconds
+    if not MIN_MUTE_SECONDS <= duration <= MAX_MUTE_SECONDS:
+        return None, None
 
-    now = datetime.utcnow()
-    match unit:
-        case 's':
-            until_date = now + timedelta(seconds=amount)
-            duration_str = f"{amount} sec."
-        case 'm':
-            until_date = now + timedelta(minutes=amount)
-            duration_str = f"{amount} min."
-        case 'h':
-            until_date = now + timedelta(hours=amount)
-            duration_str = f"{amount} h."
-        case 'd':
-            until_date = now + timedelta(days=amount)
-            duration_str = f"{amount} d."
-        case 'w':
-            until_date = now + timedelta(weeks=amount)
-            duration_str = f"{amount} w."
-        case 'M':
-            until_date = now + timedelta(days=30 * amount)  # Approximate a month as 30 days
-            duration_str = f"{amount} M."
-        case 'y':
-            until_date = now + timedelta(days=365 * amount)  # Approximate a year as 365 days
-            duration_str = f"{amount} y."
-        case _:
-            return None, None
-
-    return until_date, duration_str
+    duration_str = f"{amount} {unit_name}"
+    return duration, duration_str
+
+
+async def mute_member(chat_id: int, user_id: int, duration: int):
+    # until_date is a unix timestamp taken only once _send has let the request through the rate limiters,
+    # so time spent waiting there can't push the mute below Telegram's 30 second minimum
+    return await bot.restrict_chat_member(
+        chat_id=chat_id,
+        user_id=user_id,
+        until_date=int(time.time()) + duration,
+        permissions=_MUTE_PERMS
+    )
 
 
 async def send_invite(user_id: int):
     try:
-        await bot.send_message(user_id, CHAT_LINK)
+        await _send(bot(_INVITE.model_copy(update={'chat_id': user_id})), user_id)
         logging.info(f"Invite sent to user {user_id}")
-    except Exception as e:
+    except TelegramRetryAfter as e:
+        logging.warning(f"Flood control, retrying invite to user {user_id} in {e.retry_after}s")
+        scheduler.add_job(send_invite, 'date', run_date=datetime.now() + timedelta(seconds=e.retry_after),
+                          args=[user_id])
+    except TelegramForbiddenError as e:
+        logging.info(f"Can't send invite to user {user_id}: {e}")
+    except TelegramAPIError as e:
         logging.error(f"Failed to send invite: {e}")
 
 
+# Events
+@dp.chat_member()
+@dp.my_chat_member()
+async def update_admin_cache(event: types.ChatMemberUpdated):
+    member = event.new_chat_member
+    # Only refresh users we already track; joins and leaves of everyone else aren't worth caching
+    if (event.chat.id, member.user.id) not in _admin_cache:
+        return
+    _admin_cache[(event.chat.id, member.user.id)] = (is_admin_status(member.status),
+                                                     time.monotonic() + ADMIN_CACHE_TTL)
+
+
 # Commands
 @private_router.message(Command("start"))
 async def start(message: types.Message):
-    await message.reply("Этот бот создан для поддержания дружественной атмосферы в чате ☺️")
+    await _send(message.reply("Этот бот создан для поддержания дружественной атмосферы в чате ☺️"), message.chat.id)
 
 
-@group_router.message(Command("help"))
-async def help_message(message: types.Message):
+async def help_message(message: types.Message, command: CommandObject):
     help_text = """
     <b>Available Commands:</b>
 <b>/start</b> - Starts the bot and sends a welcome message.
@@ -147,29 +279,28 @@ async def help_message(message: types.Message):
 <b>/ban &lt;time&gt;</b> - Bans a user for the specified time. Time can be in hours (h), days (d), or weeks (w).
 <b>/unban</b> - Removes the ban from the user.
     """
-    await message.reply(help_text, parse_mode='HTML')
+    await _send(message.reply(help_text), message.chat.id)
 
 
-@group_router.message(Command("info"))
-async def info(message: types.Message):
+async def info(message: types.Message, command: CommandObject):
     user_id = message.from_user.id
     try:
-        await bot.send_message(user_id, 'This bot is created by @morry_dev.')
-        await message.reply('Information sent to your private messages.')
-    except Exception as e:
+        await _send(bot.send_message(user_id, 'This bot is created by @morry_dev.'), user_id)
+        await _send(message.reply('Information sent to your private messages.'), message.chat.id)
+    except TelegramAPIError as e:
         logging.error(f"Failed to send message: {e}")
-        await message.reply("Failed to send information to your private messages.")
+        await _send(message.reply("Failed to send information to your private messages."), message.chat.id)
 
 
 @private_router.message()
 async def private(message: types.Message):
-    await message.reply("😔 <b>Бот работает только в группах</b>")
+    await _send(message.reply("😔 <b>Бот работает только в группах</b>"), message.chat.id)
 
 
-@group_router.message(Command("ban"))
-async def func_kick(message: types.Message):
+async def func_kick(message: types.Message, command: CommandObject):
     logging.info("Ban command received")
-    if not await check_admin(message):
+    is_admin, target_is_admin = await check_admin_and_target(message)
+    if not is_admin:
         logging.info("User is not admin")
         return
 
@@ -181,28 +312,31 @@ async def func_kick(message: types.Message):
     user_to_kick_id = reply_message.from_user.id
     moderator_id = message.from_user.id
 
-    if await is_user_admin(message.chat.id, user_to_kick_id):
+    if target_is_admin:
         await send_error(message, "Нельзя удалить администратора!")
         return
 
     try:
-        await bot.ban_chat_member(chat_id=message.chat.id, user_id=user_to_kick_id)
+        await _send(bot.ban_chat_member(chat_id=message.chat.id, user_id=user_to_kick_id), message.chat.id)
         logging.info(f"User {reply_message.from_user.id} banned")
-        await message.answer(
-            f"🚫 <a href='tg://user?id={user_to_kick_id}'>{reply_message.from_user.full_name}</a> заблокирован навсегда\n"
-            f"👤 Модератор: <a href='tg://user?id={moderator_id}'>{message.from_user.first_name}</a>", parse_mode='HTML')
+        ban_message = _BAN_TEMPLATE.format_map({
+            'tid': user_to_kick_id,
+            'tname': reply_message.from_user.full_name,
+            'mid': moderator_id,
+            'mname': message.from_user.first_name,
+        })
+        await _send(message.answer(ban_message), message.chat.id)
         logging.info("Ban message sent successfully")
     except TelegramBadRequest as e:
         await send_error(message, f"Не удалось удалить пользователя: {e}")
         logging.error(f"Failed to kick user: {e}")
-    except Exception as e:
-        # Ловим любые другие возможные исключения
+    except TelegramAPIError as e:
+        # Ловим любые другие ошибки Telegram API
         await send_error(message, f"Произошла ошибка: {e}")
         logging.error(f"Unexpected error: {e}")
 
 
-@group_router.message(Command("unban"))
-async def func_unban(message: types.Message):
+async def func_unban(message: types.Message, command: CommandObject):
     if not await check_admin(message):
         return
 
@@ -211,32 +345,49 @@ async def func_unban(message: types.Message):
         await send_error(message, "Вам нужно сделать это в ответ на сообщение пользователя!")
         return
     try:
-        await bot.unban_chat_member(chat_id=message.chat.id, user_id=reply_message.from_user.id, only_if_banned=True)
-        await message.answer("✅ Блокировка была снята")
-
-        chat_link = CHAT_LINK  # Make sure CHAT_LINK is properly defined
-        await bot.send_message(reply_message.from_user.id, chat_link)
+        await _send(bot.unban_chat_member(chat_id=message.chat.id, user_id=reply_message.from_user.id,
+                                          only_if_banned=True), message.chat.id)
+    except TelegramRetryAfter as e:
+        # Replying now would hit flood control too; run the whole command again once it is lifted
+        logging.warning(f"Flood control, retrying unban in chat {message.chat.id} in {e.retry_after}s")
+        scheduler.add_job(func_unban, 'date', run_date=datetime.now() + timedelta(seconds=e.retry_after),
+                          args=[message, command])
+        return
+    except TelegramForbiddenError as e:
+        # The bot was kicked or blocked in this chat, so there is nowhere to reply
+        logging.error(f"Failed to unban user in chat {message.chat.id}: {e}")
+        return
+    except TelegramBadRequest as e:
+        await send_error(message, f"Не удалось снять блокировку: {e}")
+        return
+    except TelegramAPIError as e:
+        await send_error(message, f"Произошла ошибка: {e}")
+        logging.error(f"Unexpected error: {e}")
+        return
 
-    except Exception as e:
-        # Log or handle the exception
-        await send_error(message, f"Произошла ошибка: {str(e)}")
+    # The announcement and the invite are independent, so send them concurrently;
+    # send_invite handles its own errors and reschedules itself on flood control
+    announce_result, _ = await asyncio.gather(
+        _send(message.answer("✅ Блокировка была снята"), message.chat.id),
+        send_invite(reply_message.from_user.id),
+        return_exceptions=True,
+    )
+    if isinstance(announce_result, Exception):
+        logging.error(f"Failed to send unban message: {announce_result}")
 
 
-@group_router.message(Command("mute"))
-async def func_mute(message: types.Message, ):
+async def func_mute(message: types.Message, command: CommandObject):
     logging.info("Mute command received")
-    if not await check_admin(message):
+    is_admin, target_is_admin = await check_admin_and_target(message)
+    if not is_admin:
         logging.info("User is not admin")
         return
 
-    command_text = message.text.split(maxsplit=1)
-    logging.info(f"Command text: {command_text}")
-
-    if len(command_text) < 2:
+    if not command.args:
         await send_error(message, "Вам нужно указать аргументы команды!")
         return
 
-    args = command_text[1].strip()
+    args = command.args.strip()
     logging.info(f"Arguments: '{args}'")
 
     if not args:
@@ -250,52 +401,41 @@ async def func_mute(message: types.Message, ):
         return
 
     user_to_mute_id = reply_message.from_user.id
-    if await is_user_admin(message.chat.id, user_to_mute_id):
+    if target_is_admin:
         await send_error(message, "Нельзя заглушить администратора!")
         return
 
-    args = command_text.args.strip()
     if ' ' in args:
         time_str, reason = args.split(' ', 1)
     else:
         time_str = args
         reason = None
 
-    until_date, duration_str = parse_time(time_str)
+    duration, duration_str = parse_time(time_str)
 
-    # Debugging: Print or log parsed values
-    print(f"Parsed time string: {time_str}")
-    print(f"Parsed until_date: {until_date}")
-    print(f"Parsed duration_str: {duration_str}")
-    print(f"Parsed reason: {reason}")
+    # Lazy %-style arguments: nothing is formatted unless debug logging is enabled
+    logging.debug("Parsed time string: %s", time_str)
+    logging.debug("Parsed duration: %s", duration)
+    logging.debug("Parsed duration_str: %s", duration_str)
+    logging.debug("Parsed reason: %s", reason)
 
-    if until_date is None:
+    if duration is None:
         await send_error(message, "Не удалось разобрать время. Пожалуйста, используйте правильный формат времени.")
         return
 
     with suppress(TelegramBadRequest):
-        await bot.restrict_chat_member(
-            chat_id=message.chat.id,
-            user_id=user_to_mute_id,
-            until_date=until_date,
-            permissions=types.ChatPermissions(can_send_messages=False)
-        )
-
-        mute_message = (
-            f"🔇 <a href='tg://user?id={user_to_mute_id}'>{reply_message.from_user.full_name}</a> был заглушен"
-        )
-        if duration_str:
-            mute_message += f" на {duration_str}"
-        if reason:
-            mute_message += f"\nПричина: {reason}"
-        else:
-            mute_message += "!"
-
-        await message.answer(mute_message, parse_mode='HTML')
-
-
-@group_router.message(Command("unmute"))
-async def func_unmute(message: types.Message):
+        await _send(mute_member(message.chat.id, user_to_mute_id, duration), message.chat.id)
+
+        mute_message = _MUTE_TEMPLATE.format_map({
+            'tid': user_to_mute_id,
+            'tname': reply_message.from_user.full_name,
+            'duration': duration_str,
+            'suffix': f"\nПричина: {reason}" if reason else "!",
+        })
+        await _send(message.answer(mute_message), message.chat.id)
+
+
+async def func_unmute(message: types.Message, command: CommandObject):
     if not await check_admin(message):
         return
 
@@ -305,22 +445,75 @@ async def func_unmute(message: types.Message):
         return
 
     mention = reply_message.from_user.mention_html(reply_message.from_user.first_name)
-    await bot.restrict_chat_member(
+    await _send(bot.restrict_chat_member(
         chat_id=message.chat.id,
         user_id=reply_message.from_user.id,
-        permissions=types.ChatPermissions(can_send_messages=True, can_send_other_messages=True)
-    )
-    await message.answer(f"🎉 Все ограничения с пользователя <b>{mention}</b> были сняты!")
+        permissions=_UNMUTE_PERMS
+    ), message.chat.id)
+    await _send(message.answer(f"🎉 Все ограничения с пользователя <b>{mention}</b> были сняты!"), message.chat.id)
+
+
+# Group commands are looked up by name instead of testing every Command filter in turn
+HANDLERS: dict[str, Callable[[types.Message, CommandObject], Awaitable[None]]] = {
+    'help': help_message,
+    'info': info,
+    'ban': func_kick,
+    'unban': func_unban,
+    'mute': func_mute,
+    'unmute': func_unmute,
+}
+
+
+# Like Command filter, commands are read from the text or from a media caption
+@group_router.message(F.text.startswith('/') | F.caption.startswith('/'))
+async def dispatch_command(message: types.Message):
+    full_command, *args = (message.text or message.caption).split(maxsplit=1)
+    name, _, mention = full_command[1:].partition('@')
+
+    handler = HANDLERS.get(name)
+    if handler is None:
+        return
+    # Same as Command filter: /cmd@OtherBot is addressed to another bot
+    if mention and mention.lower() != (await bot.me()).username.lower():
+        return
+
+    command = CommandObject(prefix='/', command=name, mention=mention or None, args=args[0] if args else None)
+    await handler(message, command)
+
+
+async def run_webhook():
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=WEBHOOK_SECRET).register(
+        app, path=urlsplit(WEBHOOK_URL).path or '/')
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+        await bot.set_webhook(WEBHOOK_URL, secret_token=WEBHOOK_SECRET,
+                              allowed_updates=dp.resolve_used_update_types(), drop_pending_updates=True)
+        logging.info(f"Webhook server listening on {WEBHOOK_HOST}:{WEBHOOK_PORT}")
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
 
 
 async def main():
+    # AsyncIOScheduler binds to the loop it is started on, so start it inside the running loop
+    scheduler.start()
+    scheduler.add_job(purge_admin_cache, 'interval', seconds=ADMIN_CACHE_TTL)
+
     dp.include_router(private_router)
     dp.include_router(group_router)
 
+    if WEBHOOK_URL:
+        await run_webhook()
+        return
+
     await delete_webhook_with_retry(bot)
-    await bot.delete_webhook(drop_pending_updates=True)
     await dp.start_polling(bot)
 
 if __name__ == "__main__":
-    asyncio.run(main())
-    scheduler.start()
+    with asyncio.Runner(loop_factory=uvloop.new_event_loop if uvloop else None) as runner:
+        runner.run(main())